@@ -0,0 +1,352 @@
+import argparse      # Command-line options (which lifecycle action to run)
+import configparser  # Used to read configuration from dwh.cfg / .aws_credentials
+import csv
+import math
+import os
+import time
+import boto3
+from botocore.exceptions import ClientError
+from urllib.parse import urlparse
+
+# ---------------------------------------------------------
+# This script manages the Redshift cluster around ETL windows
+# instead of keeping it running 24/7 or rebuilding it from S3:
+# 1. Resume the paused cluster
+# 2. Measure the staging volume in S3 for the next load
+# 3. Elastic-resize to the node count that volume needs
+# 4. Reset the tables, run the ETL and record throughput per node count
+# 5. Snapshot and pause the cluster until the next window
+# Every function takes its boto3 clients as arguments, so the
+# whole lifecycle can be exercised offline with stubbed clients
+# (e.g. botocore.stub.Stubber).
+# ---------------------------------------------------------
+
+REGION = "us-west-2"
+THROUGHPUT_LOG = "throughput_history.csv"
+THROUGHPUT_FIELDS = ["timestamp", "node_type", "node_count", "staging_bytes", "seconds"]
+
+
+def poll_until(check, description, poll_seconds=30, timeout_seconds=3600, sleep=time.sleep):
+    """
+    Calls check() every poll_seconds until it returns something other than
+    None, and returns that value. check() raises on terminal failure states.
+    Raises TimeoutError once timeout_seconds have been spent waiting, so a
+    stuck operation cannot keep the script (and the cluster) running forever.
+    """
+    waited = 0
+    while True:
+        result = check()
+        if result is not None:
+            return result
+        if waited >= timeout_seconds:
+            raise TimeoutError(f"Gave up waiting for {description} after {waited} seconds")
+        sleep(poll_seconds)
+        waited += poll_seconds
+
+
+def wait_for_cluster_status(redshift, cluster_id, wanted, poll_seconds=30, sleep=time.sleep,
+                            node_count=None, timeout_seconds=3600):
+    """
+    Polls describe_clusters until the cluster reaches one of the wanted
+    statuses (e.g. "available", or ("available", "paused")) and returns the
+    cluster properties. An "available" cluster must also have
+    ClusterAvailabilityStatus "Available", and if node_count is given
+    NumberOfNodes must match it. A stale "available" reported right after
+    a resume or resize call is therefore not mistaken for the operation
+    having finished.
+    """
+    wanted = (wanted,) if isinstance(wanted, str) else tuple(wanted)
+
+    def check():
+        props = redshift.describe_clusters(ClusterIdentifier=cluster_id)['Clusters'][0]
+        status = props['ClusterStatus']
+        done = status in wanted
+        if status == 'available':
+            done = done and props.get('ClusterAvailabilityStatus', 'Available') == 'Available'
+        if node_count is not None:
+            done = done and props['NumberOfNodes'] == node_count
+        if done:
+            return props
+        print(f"Current status: {status} ({props['NumberOfNodes']} nodes). Waiting {poll_seconds} seconds...")
+        return None
+
+    return poll_until(check, f"cluster {cluster_id} to be {' or '.join(wanted)}",
+                      poll_seconds, timeout_seconds, sleep)
+
+
+def snapshot_cluster(redshift, cluster_id, retention_days=7, poll_seconds=30, sleep=time.sleep,
+                     timeout_seconds=3600):
+    """
+    Takes a manual snapshot of the cluster, waits until it is available
+    and returns the snapshot identifier. The snapshot is deleted
+    automatically after retention_days, so snapshots from every load
+    window do not pile up (manual snapshots are kept forever by default).
+    Raises RuntimeError if the snapshot ends up failed or deleted.
+    """
+    snapshot_id = f"{cluster_id}-{time.strftime('%Y%m%d-%H%M%S')}"
+    print(f"📸 Creating snapshot {snapshot_id} (kept {retention_days} days)...")
+    redshift.create_cluster_snapshot(
+        SnapshotIdentifier=snapshot_id,
+        ClusterIdentifier=cluster_id,
+        ManualSnapshotRetentionPeriod=retention_days
+    )
+
+    def check():
+        status = redshift.describe_cluster_snapshots(SnapshotIdentifier=snapshot_id)['Snapshots'][0]['Status']
+        if status == 'available':
+            return snapshot_id
+        if status in ('failed', 'deleted'):
+            raise RuntimeError(f"Snapshot {snapshot_id} is {status}")
+        print(f"Snapshot status: {status}. Waiting {poll_seconds} seconds...")
+        return None
+
+    return poll_until(check, f"snapshot {snapshot_id}", poll_seconds, timeout_seconds, sleep)
+
+
+def pause_cluster(redshift, cluster_id, poll_seconds=30, sleep=time.sleep, timeout_seconds=3600):
+    """
+    Pauses the cluster (compute billing stops, storage is kept).
+    Waits for a stable state first, since a cluster that is resizing or
+    resuming cannot be paused. Does nothing if it is already paused.
+    """
+    props = wait_for_cluster_status(redshift, cluster_id, ('available', 'paused'), poll_seconds, sleep,
+                                    timeout_seconds=timeout_seconds)
+    if props['ClusterStatus'] == 'paused':
+        print("Cluster is already paused.")
+        return props
+    print("⏸️ Pausing Redshift cluster...")
+    redshift.pause_cluster(ClusterIdentifier=cluster_id)
+    return wait_for_cluster_status(redshift, cluster_id, 'paused', poll_seconds, sleep,
+                                   timeout_seconds=timeout_seconds)
+
+
+def resume_cluster(redshift, cluster_id, poll_seconds=30, sleep=time.sleep, timeout_seconds=3600):
+    """
+    Resumes a paused cluster and waits until it is available.
+    Waits for a stable state first, since a cluster that is pausing,
+    resizing or modifying cannot be resumed. Does nothing if it is
+    already available.
+    """
+    props = wait_for_cluster_status(redshift, cluster_id, ('available', 'paused'), poll_seconds, sleep,
+                                    timeout_seconds=timeout_seconds)
+    if props['ClusterStatus'] == 'available':
+        print("Cluster is already available.")
+        return props
+    print("▶️ Resuming Redshift cluster...")
+    redshift.resume_cluster(ClusterIdentifier=cluster_id)
+    return wait_for_cluster_status(redshift, cluster_id, 'available', poll_seconds, sleep,
+                                   timeout_seconds=timeout_seconds)
+
+
+def measure_staging_bytes(s3, s3_paths):
+    """
+    Returns the total size in bytes of every object under the given
+    s3:// prefixes (e.g. LOG_DATA and SONG_DATA from dwh.cfg).
+    """
+    total = 0
+    paginator = s3.get_paginator('list_objects_v2')
+    for path in s3_paths:
+        url = urlparse(path)
+        for page in paginator.paginate(Bucket=url.netloc, Prefix=url.path.lstrip('/')):
+            total += sum(obj['Size'] for obj in page.get('Contents', []))
+    return total
+
+
+def load_throughput_history(path=THROUGHPUT_LOG):
+    """
+    Reads past ETL runs from the throughput CSV (empty list if none yet).
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def record_throughput(node_type, node_count, staging_bytes, seconds, path=THROUGHPUT_LOG):
+    """
+    Appends one ETL run (node type, node count, bytes loaded, duration)
+    to the throughput CSV.
+    """
+    is_new = not os.path.exists(path)
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=THROUGHPUT_FIELDS)
+        if is_new:
+            writer.writeheader()
+        writer.writerow({
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "node_type": node_type,
+            "node_count": node_count,
+            "staging_bytes": staging_bytes,
+            "seconds": round(seconds, 1),
+        })
+
+
+def choose_node_count(staging_bytes, history, node_type, window_seconds,
+                      min_nodes, max_nodes, default_nodes):
+    """
+    Picks the smallest node count expected to load staging_bytes within
+    window_seconds, based on the average bytes/second/node measured in
+    past runs on the same node type. Falls back to default_nodes when
+    there is no history yet. The result is clamped to [min_nodes, max_nodes].
+    """
+    rates = [
+        int(run["staging_bytes"]) / float(run["seconds"]) / int(run["node_count"])
+        for run in history
+        if run["node_type"] == node_type and float(run["seconds"]) > 0
+    ]
+    if not rates:
+        nodes = default_nodes
+    else:
+        bytes_per_node_second = sum(rates) / len(rates)
+        nodes = math.ceil(staging_bytes / (bytes_per_node_second * window_seconds))
+    return max(min_nodes, min(max_nodes, nodes))
+
+
+def wait_for_resize(redshift, cluster_id, node_count, poll_seconds=30, sleep=time.sleep,
+                    timeout_seconds=3600):
+    """
+    Polls describe_resize until the resize to node_count nodes succeeds.
+    Raises RuntimeError if it fails or is cancelled: Redshift then rolls
+    back and reports the cluster "available" with the old node count,
+    which would otherwise never match node_count.
+    """
+    def check():
+        try:
+            resize = redshift.describe_resize(ClusterIdentifier=cluster_id)
+        except redshift.exceptions.ResizeNotFoundFault:
+            print(f"Resize not registered yet. Waiting {poll_seconds} seconds...")
+            return None
+        if resize.get('TargetNumberOfNodes') != node_count:
+            print(f"Resize to {node_count} nodes not registered yet. Waiting {poll_seconds} seconds...")
+            return None
+        status = resize['Status']
+        if status == 'SUCCEEDED':
+            return resize
+        if status in ('FAILED', 'CANCELLED'):
+            raise RuntimeError(f"Resize to {node_count} nodes {status.lower()}: {resize.get('Message', '')}")
+        print(f"Resize status: {status}. Waiting {poll_seconds} seconds...")
+        return None
+
+    return poll_until(check, f"resize of {cluster_id} to {node_count} nodes", poll_seconds, timeout_seconds, sleep)
+
+
+def resize_cluster(redshift, cluster_id, node_count, poll_seconds=30, sleep=time.sleep, timeout_seconds=3600):
+    """
+    Elastic-resizes the cluster to node_count nodes and waits until it is
+    available again with that many nodes. Does nothing if it already has
+    that many nodes. Raises RuntimeError if the resize fails.
+    """
+    props = redshift.describe_clusters(ClusterIdentifier=cluster_id)['Clusters'][0]
+    if props['NumberOfNodes'] == node_count:
+        print(f"Cluster already has {node_count} nodes.")
+        return props
+    print(f"📐 Resizing cluster from {props['NumberOfNodes']} to {node_count} nodes...")
+    redshift.resize_cluster(ClusterIdentifier=cluster_id, NumberOfNodes=node_count, Classic=False)
+    wait_for_resize(redshift, cluster_id, node_count, poll_seconds, sleep, timeout_seconds)
+    return wait_for_cluster_status(redshift, cluster_id, 'available', poll_seconds, sleep,
+                                   node_count=node_count, timeout_seconds=timeout_seconds)
+
+
+def run_load_window(redshift, s3, config, reset_tables, run_etl, sleep=time.sleep,
+                    history_path=THROUGHPUT_LOG):
+    """
+    Runs one full load window: resume, measure staging volume, resize,
+    reset the tables, run the ETL, record throughput, snapshot and pause.
+    reset_tables and run_etl are called with no arguments
+    (create_tables.main and etl.main in production). The tables are reset
+    first because the cluster keeps its data between windows, and the ETL
+    reloads the full S3 prefixes every time.
+    Resizing is only an optimisation: if it fails the ETL runs on the
+    current node count, and that count is what gets recorded.
+    Once the cluster is resumed it is always snapshotted and paused again,
+    even if the ETL fails, so a failed run does not leave it billing.
+    Throughput is only recorded for successful runs.
+    """
+    cluster_id = config.get("DWH", "DWH_CLUSTER_IDENTIFIER")
+    node_type = config.get("DWH", "DWH_NODE_TYPE")
+    retention_days = config.getint("DWH", "DWH_SNAPSHOT_RETENTION_DAYS", fallback=7)
+    timeout_seconds = config.getint("DWH", "DWH_WAIT_TIMEOUT_SECONDS", fallback=3600)
+
+    resume_cluster(redshift, cluster_id, sleep=sleep, timeout_seconds=timeout_seconds)
+
+    try:
+        staging_bytes = measure_staging_bytes(s3, [config.get("S3", "LOG_DATA"), config.get("S3", "SONG_DATA")])
+        print(f"Staging volume for this load: {staging_bytes} bytes")
+
+        target_nodes = choose_node_count(
+            staging_bytes,
+            load_throughput_history(history_path),
+            node_type,
+            window_seconds=config.getint("DWH", "DWH_LOAD_WINDOW_SECONDS", fallback=3600),
+            min_nodes=config.getint("DWH", "DWH_MIN_NODES", fallback=2),
+            max_nodes=config.getint("DWH", "DWH_MAX_NODES", fallback=8),
+            default_nodes=config.getint("DWH", "DWH_NUM_NODES"),
+        )
+        try:
+            props = resize_cluster(redshift, cluster_id, target_nodes, sleep=sleep,
+                                   timeout_seconds=timeout_seconds)
+        except (ClientError, RuntimeError) as e:
+            print(f"⚠️ Resize to {target_nodes} nodes failed, running on the current size: {e}")
+            props = wait_for_cluster_status(redshift, cluster_id, 'available', sleep=sleep,
+                                            timeout_seconds=timeout_seconds)
+        node_count = props['NumberOfNodes']
+
+        reset_tables()
+
+        start = time.time()
+        run_etl()
+        seconds = time.time() - start
+        record_throughput(node_type, node_count, staging_bytes, seconds, history_path)
+        print(f"ETL finished in {seconds:.1f}s on {node_count} x {node_type}")
+    finally:
+        try:
+            snapshot_cluster(redshift, cluster_id, retention_days, sleep=sleep,
+                             timeout_seconds=timeout_seconds)
+        finally:
+            pause_cluster(redshift, cluster_id, sleep=sleep, timeout_seconds=timeout_seconds)
+
+
+def main():
+    """
+    - Reads AWS credentials from .aws_credentials and settings from dwh.cfg
+    - Runs one lifecycle action on the cluster:
+      resume, pause, snapshot, or run (a full load window)
+    """
+    parser = argparse.ArgumentParser(description="Pause/resume, snapshot and autosize the Redshift cluster.")
+    parser.add_argument("action", choices=["resume", "pause", "snapshot", "run"])
+    args = parser.parse_args()
+
+    creds = configparser.ConfigParser()
+    creds.read('.aws_credentials', encoding='utf-8')
+    KEY = creds.get('AWS', 'KEY')
+    SECRET = creds.get('AWS', 'SECRET')
+
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg', encoding='utf-8')
+    cluster_id = config.get("DWH", "DWH_CLUSTER_IDENTIFIER")
+    timeout_seconds = config.getint("DWH", "DWH_WAIT_TIMEOUT_SECONDS", fallback=3600)
+
+    redshift = boto3.client('redshift', region_name=REGION,
+                            aws_access_key_id=KEY,
+                            aws_secret_access_key=SECRET)
+
+    if args.action == "resume":
+        resume_cluster(redshift, cluster_id, timeout_seconds=timeout_seconds)
+    elif args.action == "pause":
+        pause_cluster(redshift, cluster_id, timeout_seconds=timeout_seconds)
+    elif args.action == "snapshot":
+        snapshot_cluster(redshift, cluster_id,
+                         config.getint("DWH", "DWH_SNAPSHOT_RETENTION_DAYS", fallback=7),
+                         timeout_seconds=timeout_seconds)
+    else:
+        import create_tables, etl  # Imported here: sql_queries needs a filled-in dwh.cfg
+        s3 = boto3.client('s3', region_name=REGION,
+                          aws_access_key_id=KEY,
+                          aws_secret_access_key=SECRET)
+        run_load_window(redshift, s3, config, create_tables.main, etl.main)
+
+    print("✅ Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ def drop_tables(cur, conn):
     These queries are defined in sql_queries.py and include:
     - staging_events
     - staging_songs
+    - song_catalog
+    - artist_catalog
+    - artist_lookup
+    - song_lookup
     - songplays
     - users
     - songs
@@ -29,6 +33,7 @@ def create_tables(cur, conn):
     Creates all tables listed in the create_table_queries list.
     These are also defined in sql_queries.py and include:
     - staging tables (raw S3 data)
+    - catalog tables (deduplicated songs/artists and the songplays lookups)
     - analytics tables (fact & dimension tables in the star schema)
     """
     for query in create_table_queries:
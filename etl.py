@@ -1,11 +1,12 @@
 import configparser
 import psycopg2
-from sql_queries import copy_table_queries, insert_table_queries
+from sql_queries import copy_table_queries, catalog_table_queries, insert_table_queries
 
 # ---------------------------------------------------------
 # This script performs the ETL pipeline:
 # 1. Load data from S3 to staging tables (COPY)
-# 2. Transform and insert into star schema tables (INSERT)
+# 2. Deduplicate the song catalog and build lookup tables
+# 3. Transform and insert into star schema tables (INSERT)
 # ---------------------------------------------------------
 
 def load_staging_tables(cur, conn):
@@ -18,6 +19,17 @@ def load_staging_tables(cur, conn):
         cur.execute(query)
         conn.commit()
 
+def preprocess_catalog(cur, conn):
+    """
+    Builds one canonical row per song_id / artist_id from staging_songs
+    and the compact lookup tables (artist name -> artist_id,
+    normalized title -> song_id) used by the songplays join.
+    """
+    for query in catalog_table_queries:
+        print(f"Running CATALOG query:\n{query}\n")
+        cur.execute(query)
+        conn.commit()
+
 def insert_tables(cur, conn):
     """
     Inserts data from staging tables into the analytics tables
@@ -33,6 +45,7 @@ def main():
     - Reads connection config from dwh.cfg
     - Connects to Redshift using psycopg2
     - Executes data load from S3 to staging tables
+    - Deduplicates the song catalog into canonical and lookup tables
     - Executes inserts from staging to star schema tables
     - Closes the connection
     """
@@ -52,6 +65,7 @@ def main():
 
     # Perform data load and transformation
     load_staging_tables(cur, conn)
+    preprocess_catalog(cur, conn)
     insert_tables(cur, conn)
 
     # Close Redshift connection
@@ -0,0 +1,229 @@
+import argparse      # Command-line options (target section, thresholds)
+import configparser  # Used to read configuration from the dwh.cfg file
+import glob
+import json
+import os
+import re
+import sys
+from datetime import datetime
+import psycopg2      # PostgreSQL adapter to connect to Redshift
+from sql_queries import catalog_table_queries, insert_table_queries
+
+# ---------------------------------------------------------
+# This script captures the query plans of the transform SQL:
+# 1. Runs EXPLAIN on every INSERT in catalog_table_queries and
+#    insert_table_queries
+# 2. Parses each plan into steps (operation, cost, rows)
+# 3. Stores the parsed plans for this run under plans/
+# 4. Compares against the last clean run and flags regressions
+#    (new broadcast/redistribute steps, nested loops, cost jumps)
+# Exits with status 1 when a regression is found, so it can
+# gate a deploy before the nightly ETL runs. After an intended
+# plan change, rerun with --accept to make it the new baseline.
+# ---------------------------------------------------------
+
+PLANS_DIR = "plans"
+
+# Redshift join distribution labels that move rows between nodes.
+# DS_DIST_NONE / DS_DIST_ALL_NONE mean the join is already co-located.
+REDISTRIBUTION_STEPS = [
+    "DS_BCAST_INNER",
+    "DS_DIST_ALL_INNER",
+    "DS_DIST_BOTH",
+    "DS_DIST_INNER",
+    "DS_DIST_OUTER",
+]
+
+PLAN_LINE = re.compile(
+    r"^(?P<indent>\s*)(?:->\s*)?(?P<operation>.*?)\s*"
+    r"\(cost=(?P<startup>[\d.]+)\.\.(?P<total>[\d.]+)\s+rows=(?P<rows>\d+)\s+width=(?P<width>\d+)\)"
+)
+
+
+def query_name(query):
+    """
+    Returns a stable name for a statement, taken from its target table
+    (e.g. "INSERT INTO songplays ..." -> "songplays").
+    """
+    match = re.search(r"INSERT\s+INTO\s+(\w+)", query, re.IGNORECASE)
+    return match.group(1) if match else query.strip().split()[0].lower()
+
+
+def parse_plan(lines):
+    """
+    Parses the text rows returned by EXPLAIN into a summary dict:
+    - steps: every plan node with its operation, cost and row estimate
+    - total_cost: the top node's total cost
+    - nested_loops: number of Nested Loop nodes
+    - redistributions: count of each data-movement label found
+    Works for both Redshift ("XN Hash Join DS_BCAST_INNER") and
+    Postgres ("Hash Join") plan text.
+    """
+    steps = []
+    for line in lines:
+        match = PLAN_LINE.match(line)
+        if not match:
+            continue
+        steps.append({
+            "depth": len(match.group("indent")),
+            "operation": match.group("operation"),
+            "startup_cost": float(match.group("startup")),
+            "total_cost": float(match.group("total")),
+            "rows": int(match.group("rows")),
+            "width": int(match.group("width")),
+        })
+
+    text = "\n".join(lines)
+    return {
+        "plan": list(lines),
+        "steps": steps,
+        "total_cost": steps[0]["total_cost"] if steps else 0.0,
+        "nested_loops": len(re.findall(r"Nested Loop", text)),
+        "redistributions": {
+            label: text.count(label)
+            for label in REDISTRIBUTION_STEPS
+            if label in text
+        },
+    }
+
+
+def explain_queries(cur, queries):
+    """
+    Runs EXPLAIN on each INSERT query and returns {query name: parsed plan}.
+    Other statements (e.g. the TRUNCATEs that start catalog_table_queries)
+    are skipped. EXPLAIN only plans the statement, so no rows are inserted.
+    """
+    plans = {}
+    for query in queries:
+        if not query.strip().upper().startswith("INSERT"):
+            continue
+        name = query_name(query)
+        print(f"Running EXPLAIN for {name}...")
+        cur.execute("EXPLAIN " + query.strip().rstrip(";"))
+        plans[name] = parse_plan([row[0] for row in cur.fetchall()])
+    return plans
+
+
+def find_regressions(previous, current, cost_ratio=2.0):
+    """
+    Compares two runs ({query name: parsed plan}) and returns a list of
+    human-readable regression messages. Flags:
+    - redistribution labels that are new or appear more often
+    - more Nested Loop nodes than before
+    - total cost growing by more than cost_ratio times
+    """
+    regressions = []
+    for name, plan in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+
+        for label, count in plan["redistributions"].items():
+            old_count = before["redistributions"].get(label, 0)
+            if count > old_count:
+                regressions.append(f"{name}: {label} steps went from {old_count} to {count}")
+
+        if plan["nested_loops"] > before["nested_loops"]:
+            regressions.append(
+                f"{name}: Nested Loop steps went from {before['nested_loops']} to {plan['nested_loops']}"
+            )
+
+        old_cost = before["total_cost"]
+        if old_cost > 0 and plan["total_cost"] > old_cost * cost_ratio:
+            regressions.append(
+                f"{name}: total cost went from {old_cost:.2f} to {plan['total_cost']:.2f}"
+            )
+    return regressions
+
+
+def latest_run(target, plans_dir=PLANS_DIR):
+    """
+    Returns the plans of the most recent stored run for a target that had
+    no regressions, or None. Skipping flagged runs keeps a regression from
+    silently becoming the new baseline.
+    """
+    for path in sorted(glob.glob(os.path.join(plans_dir, f"{target}_*.json")), reverse=True):
+        with open(path, "r", encoding="utf-8") as f:
+            run = json.load(f)
+        if not run["regressions"]:
+            return run["plans"]
+    return None
+
+
+def save_run(target, plans, regressions, plans_dir=PLANS_DIR):
+    """
+    Writes this run's parsed plans and regressions to
+    plans/<target>_<timestamp>.json and returns the file path.
+    The timestamp includes microseconds so back-to-back runs never
+    overwrite each other.
+    """
+    os.makedirs(plans_dir, exist_ok=True)
+    path = os.path.join(plans_dir, f"{target}_{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"plans": plans, "regressions": regressions}, f, indent=2)
+    return path
+
+
+def main():
+    """
+    - Reads connection config from dwh.cfg ([CLUSTER] by default,
+      or another Redshift connection section via --section)
+    - Runs EXPLAIN on every catalog and final-table INSERT and parses the plans
+    - Compares against the last clean run stored for the same section
+    - Stores the new run and exits 1 if any regression was found,
+      unless --accept is given (the run is then stored as the new baseline)
+    """
+    parser = argparse.ArgumentParser(description="Capture and check query plans for the transform SQL.")
+    parser.add_argument("--section", default="CLUSTER",
+                        help="dwh.cfg section with HOST/DB_NAME/DB_USER/DB_PASSWORD/DB_PORT")
+    parser.add_argument("--cost-ratio", type=float, default=2.0,
+                        help="flag a query whose total cost grows by more than this factor")
+    parser.add_argument("--accept", action="store_true",
+                        help="accept this run's plans as the new baseline, even if they changed")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read('dwh.cfg', encoding='utf-8')
+
+    conn = psycopg2.connect(
+        host=config.get(args.section, "HOST"),
+        dbname=config.get(args.section, "DB_NAME"),
+        user=config.get(args.section, "DB_USER"),
+        password=config.get(args.section, "DB_PASSWORD"),
+        port=config.get(args.section, "DB_PORT")
+    )
+    cur = conn.cursor()
+
+    plans = explain_queries(cur, catalog_table_queries + insert_table_queries)
+    conn.close()
+
+    target = args.section.lower()
+    previous = latest_run(target)
+    regressions = find_regressions(previous, plans, args.cost_ratio) if previous else []
+
+    if args.accept:
+        path = save_run(target, plans, [])
+        print(f"Plans saved to {path}")
+        for message in regressions:
+            print(f"  - accepted: {message}")
+        print("✅ This run is now the baseline.")
+        return
+
+    path = save_run(target, plans, regressions)
+    print(f"Plans saved to {path}")
+
+    if previous is None:
+        print("No previous run found. This run becomes the baseline.")
+        return
+
+    if regressions:
+        print("❌ Query plan regressions found:")
+        for message in regressions:
+            print(f"  - {message}")
+        sys.exit(1)
+
+    print("✅ No query plan regressions.")
+
+
+if __name__ == "__main__":
+    main()
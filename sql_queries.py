@@ -22,6 +22,10 @@ user_table_drop = "DROP TABLE IF EXISTS users;"
 song_table_drop = "DROP TABLE IF EXISTS songs;"
 artist_table_drop = "DROP TABLE IF EXISTS artists;"
 time_table_drop = "DROP TABLE IF EXISTS time;"
+song_catalog_table_drop = "DROP TABLE IF EXISTS song_catalog;"
+artist_catalog_table_drop = "DROP TABLE IF EXISTS artist_catalog;"
+artist_lookup_table_drop = "DROP TABLE IF EXISTS artist_lookup;"
+song_lookup_table_drop = "DROP TABLE IF EXISTS song_lookup;"
 
 # ======================
 # CREATE TABLE STATEMENTS
@@ -66,6 +70,48 @@ CREATE TABLE IF NOT EXISTS staging_songs (
 );
 """)
 
+# Catalog tables (one canonical row per key, built from staging_songs)
+song_catalog_table_create = ("""
+CREATE TABLE IF NOT EXISTS song_catalog (
+    song_id   TEXT PRIMARY KEY,
+    title     TEXT,
+    artist_id TEXT,
+    year      INT,
+    duration  FLOAT
+);
+""")
+
+artist_catalog_table_create = ("""
+CREATE TABLE IF NOT EXISTS artist_catalog (
+    artist_id TEXT PRIMARY KEY,
+    name      TEXT,
+    location  TEXT,
+    latitude  FLOAT,
+    longitude FLOAT
+);
+""")
+
+# Lookup tables for the songplays join (small, so copied to every node).
+# artist_lookup resolves ambiguous names while song_lookup is built.
+artist_lookup_table_create = ("""
+CREATE TABLE IF NOT EXISTS artist_lookup (
+    name_key  TEXT PRIMARY KEY,
+    artist_id TEXT NOT NULL
+)
+DISTSTYLE ALL;
+""")
+
+song_lookup_table_create = ("""
+CREATE TABLE IF NOT EXISTS song_lookup (
+    name_key  TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    song_id   TEXT NOT NULL,
+    artist_id TEXT NOT NULL,
+    PRIMARY KEY (name_key, title_key)
+)
+DISTSTYLE ALL;
+""")
+
 # Fact table
 songplay_table_create = ("""
 CREATE TABLE IF NOT EXISTS songplays (
@@ -141,6 +187,131 @@ REGION 'us-west-2'
 FORMAT AS JSON 'auto';
 """)
 
+# ======================
+# CATALOG PREPROCESSING
+# ======================
+# staging_songs can repeat the same song_id/artist_id with conflicting
+# attributes, so DISTINCT over every column still leaves duplicate keys.
+# These statements keep exactly one row per key using a deterministic rule:
+# the row with the most populated attributes wins, ties broken by the
+# attribute values themselves.
+
+# The catalog and lookup tables are rebuilt on every run. Redshift does not
+# enforce PRIMARY KEY, so they are emptied first instead of appended to.
+song_catalog_table_truncate = "TRUNCATE song_catalog;"
+artist_catalog_table_truncate = "TRUNCATE artist_catalog;"
+artist_lookup_table_truncate = "TRUNCATE artist_lookup;"
+song_lookup_table_truncate = "TRUNCATE song_lookup;"
+
+song_catalog_insert = ("""
+INSERT INTO song_catalog (song_id, title, artist_id, year, duration)
+SELECT song_id, title, artist_id, year, duration
+FROM (
+    SELECT
+        song_id,
+        title,
+        artist_id,
+        NULLIF(year, 0) AS year,
+        duration,
+        ROW_NUMBER() OVER (
+            PARTITION BY song_id
+            ORDER BY
+                (CASE WHEN title IS NULL THEN 1 ELSE 0 END
+                 + CASE WHEN artist_id IS NULL THEN 1 ELSE 0 END
+                 + CASE WHEN NULLIF(year, 0) IS NULL THEN 1 ELSE 0 END
+                 + CASE WHEN duration IS NULL THEN 1 ELSE 0 END),
+                artist_id, title, year DESC, duration DESC
+        ) AS rn
+    FROM staging_songs
+    WHERE song_id IS NOT NULL
+) ranked
+WHERE rn = 1;
+""")
+
+artist_catalog_insert = ("""
+INSERT INTO artist_catalog (artist_id, name, location, latitude, longitude)
+SELECT artist_id, name, location, latitude, longitude
+FROM (
+    SELECT
+        artist_id,
+        artist_name                       AS name,
+        NULLIF(TRIM(artist_location), '') AS location,
+        artist_latitude                   AS latitude,
+        artist_longitude                  AS longitude,
+        ROW_NUMBER() OVER (
+            PARTITION BY artist_id
+            ORDER BY
+                (CASE WHEN artist_name IS NULL THEN 1 ELSE 0 END
+                 + CASE WHEN NULLIF(TRIM(artist_location), '') IS NULL THEN 1 ELSE 0 END
+                 + CASE WHEN artist_latitude IS NULL OR artist_longitude IS NULL THEN 2 ELSE 0 END),
+                artist_name, artist_location, artist_latitude, artist_longitude
+        ) AS rn
+    FROM staging_songs
+    WHERE artist_id IS NOT NULL
+) ranked
+WHERE rn = 1;
+""")
+
+# Lookup keys are LOWER(TRIM(...)) of the names, so the songplays join
+# is case- and whitespace-insensitive (the old join on staging_songs
+# compared artist_name/title exactly). Every artist_name spelling seen in
+# staging_songs gets a key, not just the canonical artist_catalog name.
+
+# Normalized artist name -> one artist_id (lowest id wins on name clashes)
+artist_lookup_insert = ("""
+INSERT INTO artist_lookup (name_key, artist_id)
+SELECT name_key, artist_id
+FROM (
+    SELECT
+        name_key,
+        artist_id,
+        ROW_NUMBER() OVER (PARTITION BY name_key ORDER BY artist_id) AS rn
+    FROM (
+        SELECT DISTINCT
+            LOWER(TRIM(artist_name)) AS name_key,
+            artist_id
+        FROM staging_songs
+        WHERE artist_name IS NOT NULL AND artist_id IS NOT NULL
+    ) pairs
+) ranked
+WHERE rn = 1;
+""")
+
+# (normalized artist name, normalized title) -> one song_id plus that
+# song's own artist_id from song_catalog, so songplays never pairs a song
+# with another artist. When a name/title pair matches several songs, the
+# one by the artist the name resolves to in artist_lookup wins, then the
+# lowest song_id.
+song_lookup_insert = ("""
+INSERT INTO song_lookup (name_key, title_key, song_id, artist_id)
+SELECT name_key, title_key, song_id, artist_id
+FROM (
+    SELECT
+        pairs.name_key,
+        pairs.title_key,
+        c.song_id,
+        c.artist_id,
+        ROW_NUMBER() OVER (
+            PARTITION BY pairs.name_key, pairs.title_key
+            ORDER BY
+                CASE WHEN c.artist_id = l.artist_id THEN 0 ELSE 1 END,
+                c.song_id
+        ) AS rn
+    FROM (
+        SELECT DISTINCT
+            LOWER(TRIM(artist_name)) AS name_key,
+            LOWER(TRIM(title))       AS title_key,
+            song_id
+        FROM staging_songs
+        WHERE artist_name IS NOT NULL AND title IS NOT NULL AND song_id IS NOT NULL
+    ) pairs
+    JOIN song_catalog c       ON pairs.song_id = c.song_id
+    LEFT JOIN artist_lookup l ON pairs.name_key = l.name_key
+    WHERE c.artist_id IS NOT NULL
+) ranked
+WHERE rn = 1;
+""")
+
 # ======================
 # INSERT INTO FINAL TABLES
 # ======================
@@ -159,26 +330,14 @@ WHERE userId IS NOT NULL;
 
 song_table_insert = ("""
 INSERT INTO songs (song_id, title, artist_id, year, duration)
-SELECT DISTINCT
-    song_id,
-    title,
-    artist_id,
-    year,
-    duration
-FROM staging_songs
-WHERE song_id IS NOT NULL;
+SELECT song_id, title, artist_id, year, duration
+FROM song_catalog;
 """)
 
 artist_table_insert = ("""
 INSERT INTO artists (artist_id, name, location, latitude, longitude)
-SELECT DISTINCT
-    artist_id,
-    artist_name      AS name,
-    artist_location  AS location,
-    artist_latitude  AS latitude,
-    artist_longitude AS longitude
-FROM staging_songs
-WHERE artist_id IS NOT NULL;
+SELECT artist_id, name, location, latitude, longitude
+FROM artist_catalog;
 """)
 
 time_table_insert = ("""
@@ -207,8 +366,8 @@ SELECT
     e.location,
     e.userAgent    AS user_agent
 FROM staging_events e
-JOIN staging_songs s
-  ON e.song = s.title AND e.artist = s.artist_name
+JOIN song_lookup s
+  ON LOWER(TRIM(e.artist)) = s.name_key AND LOWER(TRIM(e.song)) = s.title_key
 WHERE e.page = 'NextSong';
 """)
 
@@ -219,6 +378,10 @@ WHERE e.page = 'NextSong';
 create_table_queries = [
     staging_events_table_create,
     staging_songs_table_create,
+    song_catalog_table_create,
+    artist_catalog_table_create,
+    artist_lookup_table_create,
+    song_lookup_table_create,
     songplay_table_create,
     user_table_create,
     song_table_create,
@@ -229,6 +392,10 @@ create_table_queries = [
 drop_table_queries = [
     staging_events_table_drop,
     staging_songs_table_drop,
+    song_catalog_table_drop,
+    artist_catalog_table_drop,
+    artist_lookup_table_drop,
+    song_lookup_table_drop,
     songplay_table_drop,
     user_table_drop,
     song_table_drop,
@@ -238,6 +405,19 @@ drop_table_queries = [
 
 copy_table_queries = [staging_events_copy, staging_songs_copy]
 
+# Order matters: the tables are emptied first, then the lookups are
+# built from the canonical catalog tables
+catalog_table_queries = [
+    song_catalog_table_truncate,
+    artist_catalog_table_truncate,
+    artist_lookup_table_truncate,
+    song_lookup_table_truncate,
+    song_catalog_insert,
+    artist_catalog_insert,
+    artist_lookup_insert,
+    song_lookup_insert
+]
+
 insert_table_queries = [
     user_table_insert,
     song_table_insert,
@@ -0,0 +1,325 @@
+import configparser
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+import cluster_lifecycle
+
+# ---------------------------------------------------------
+# Offline tests for cluster_lifecycle.py. The boto3 clients are
+# real but stubbed with botocore's Stubber, so no AWS calls are made.
+# Run with: python -m pytest -q
+# ---------------------------------------------------------
+
+CLUSTER_ID = "dwh-cluster"
+
+CONFIG = """
+[DWH]
+DWH_CLUSTER_IDENTIFIER=dwh-cluster
+DWH_NODE_TYPE=dc2.large
+DWH_NUM_NODES=4
+DWH_MIN_NODES=2
+DWH_MAX_NODES=8
+DWH_LOAD_WINDOW_SECONDS=100
+DWH_SNAPSHOT_RETENTION_DAYS=3
+
+[S3]
+LOG_DATA=s3://udacity-dend/log_data
+SONG_DATA=s3://udacity-dend/song_data
+"""
+
+
+def cluster(status, nodes=4, availability="Available"):
+    return {'Clusters': [{
+        'ClusterIdentifier': CLUSTER_ID,
+        'ClusterStatus': status,
+        'ClusterAvailabilityStatus': availability,
+        'NumberOfNodes': nodes,
+    }]}
+
+
+def no_sleep(seconds):
+    pass
+
+
+@pytest.fixture
+def config():
+    parser = configparser.ConfigParser()
+    parser.read_string(CONFIG)
+    return parser
+
+
+@pytest.fixture
+def redshift():
+    client = boto3.client('redshift', region_name='us-west-2',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+@pytest.fixture
+def s3():
+    client = boto3.client('s3', region_name='us-west-2',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def stub_staging_listing(stubber, log_bytes, song_bytes):
+    stubber.add_response('list_objects_v2',
+                         {'Contents': [{'Key': 'log_data/a.json', 'Size': log_bytes}], 'IsTruncated': False},
+                         {'Bucket': 'udacity-dend', 'Prefix': 'log_data'})
+    stubber.add_response('list_objects_v2',
+                         {'Contents': [{'Key': 'song_data/b.json', 'Size': song_bytes}], 'IsTruncated': False},
+                         {'Bucket': 'udacity-dend', 'Prefix': 'song_data'})
+
+
+def stub_resume(stubber):
+    stubber.add_response('describe_clusters', cluster('paused'))
+    stubber.add_response('resume_cluster', {}, {'ClusterIdentifier': CLUSTER_ID})
+    stubber.add_response('describe_clusters', cluster('resuming'))
+    stubber.add_response('describe_clusters', cluster('available'))
+
+
+def stub_snapshot_and_pause(stubber, nodes):
+    stubber.add_response('create_cluster_snapshot', {})
+    stubber.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': 'available'}]})
+    stubber.add_response('describe_clusters', cluster('available', nodes))
+    stubber.add_response('pause_cluster', {}, {'ClusterIdentifier': CLUSTER_ID})
+    stubber.add_response('describe_clusters', cluster('paused', nodes))
+
+
+def stub_resize(stubber, from_nodes, to_nodes):
+    stubber.add_response('describe_clusters', cluster('available', from_nodes))
+    stubber.add_response('resize_cluster', {},
+                         {'ClusterIdentifier': CLUSTER_ID, 'NumberOfNodes': to_nodes, 'Classic': False})
+
+
+def test_run_load_window_resizes_resets_runs_etl_then_snapshots_and_pauses(config, redshift, s3, tmp_path):
+    redshift_client, redshift_stub = redshift
+    s3_client, s3_stub = s3
+    history_path = str(tmp_path / "history.csv")
+    # 1000 bytes/second/node measured on 4 nodes -> 600000 bytes in 100s needs 6 nodes
+    cluster_lifecycle.record_throughput("dc2.large", 4, 400000, 100, history_path)
+
+    stub_resume(redshift_stub)
+    stub_staging_listing(s3_stub, 400000, 200000)
+    stub_resize(redshift_stub, 4, 6)
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'IN_PROGRESS'})
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'SUCCEEDED'})
+    redshift_stub.add_response('describe_clusters', cluster('available', 6))
+    stub_snapshot_and_pause(redshift_stub, 6)
+
+    calls = []
+    cluster_lifecycle.run_load_window(redshift_client, s3_client, config,
+                                      lambda: calls.append("reset"), lambda: calls.append("etl"),
+                                      sleep=no_sleep, history_path=history_path)
+
+    assert calls == ["reset", "etl"]
+    history = cluster_lifecycle.load_throughput_history(history_path)
+    assert len(history) == 2
+    assert history[-1]["node_count"] == "6"
+    assert history[-1]["staging_bytes"] == "600000"
+
+
+def test_run_load_window_pauses_and_skips_throughput_when_etl_fails(config, redshift, s3, tmp_path):
+    redshift_client, redshift_stub = redshift
+    s3_client, s3_stub = s3
+    history_path = tmp_path / "history.csv"
+
+    stub_resume(redshift_stub)
+    stub_staging_listing(s3_stub, 100, 100)
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    stub_snapshot_and_pause(redshift_stub, 4)
+
+    def failing_etl():
+        raise RuntimeError("COPY failed")
+
+    with pytest.raises(RuntimeError):
+        cluster_lifecycle.run_load_window(redshift_client, s3_client, config, lambda: None, failing_etl,
+                                          sleep=no_sleep, history_path=str(history_path))
+
+    assert not history_path.exists()
+
+
+def test_run_load_window_keeps_current_size_when_resize_is_rejected(config, redshift, s3, tmp_path):
+    redshift_client, redshift_stub = redshift
+    s3_client, s3_stub = s3
+    history_path = str(tmp_path / "history.csv")
+    cluster_lifecycle.record_throughput("dc2.large", 4, 400000, 100, history_path)
+
+    stub_resume(redshift_stub)
+    stub_staging_listing(s3_stub, 400000, 200000)
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_client_error('resize_cluster', 'InvalidClusterState')
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    stub_snapshot_and_pause(redshift_stub, 4)
+
+    calls = []
+    cluster_lifecycle.run_load_window(redshift_client, s3_client, config,
+                                      lambda: calls.append("reset"), lambda: calls.append("etl"),
+                                      sleep=no_sleep, history_path=history_path)
+
+    assert calls == ["reset", "etl"]
+    assert cluster_lifecycle.load_throughput_history(history_path)[-1]["node_count"] == "4"
+
+
+def test_run_load_window_keeps_current_size_when_resize_rolls_back(config, redshift, s3, tmp_path):
+    redshift_client, redshift_stub = redshift
+    s3_client, s3_stub = s3
+    history_path = str(tmp_path / "history.csv")
+    cluster_lifecycle.record_throughput("dc2.large", 4, 400000, 100, history_path)
+
+    stub_resume(redshift_stub)
+    stub_staging_listing(s3_stub, 400000, 200000)
+    stub_resize(redshift_stub, 4, 6)
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'FAILED'})
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    stub_snapshot_and_pause(redshift_stub, 4)
+
+    cluster_lifecycle.run_load_window(redshift_client, s3_client, config, lambda: None, lambda: None,
+                                      sleep=no_sleep, history_path=history_path)
+
+    assert cluster_lifecycle.load_throughput_history(history_path)[-1]["node_count"] == "4"
+
+
+def test_run_load_window_pauses_when_snapshot_fails(config, redshift, s3, tmp_path):
+    redshift_client, redshift_stub = redshift
+    s3_client, s3_stub = s3
+
+    stub_resume(redshift_stub)
+    stub_staging_listing(s3_stub, 100, 100)
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('create_cluster_snapshot', {})
+    redshift_stub.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': 'failed'}]})
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('pause_cluster', {}, {'ClusterIdentifier': CLUSTER_ID})
+    redshift_stub.add_response('describe_clusters', cluster('paused', 4))
+
+    with pytest.raises(RuntimeError, match="failed"):
+        cluster_lifecycle.run_load_window(redshift_client, s3_client, config, lambda: None, lambda: None,
+                                          sleep=no_sleep, history_path=str(tmp_path / "history.csv"))
+
+
+def test_snapshot_sets_retention_period(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('create_cluster_snapshot', {}, {
+        'SnapshotIdentifier': ANY,
+        'ClusterIdentifier': CLUSTER_ID,
+        'ManualSnapshotRetentionPeriod': 3,
+    })
+    redshift_stub.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': 'available'}]})
+
+    cluster_lifecycle.snapshot_cluster(redshift_client, CLUSTER_ID, 3, sleep=no_sleep)
+
+
+@pytest.mark.parametrize("status", ["failed", "deleted"])
+def test_snapshot_raises_on_terminal_status(redshift, status):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('create_cluster_snapshot', {})
+    redshift_stub.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': 'creating'}]})
+    redshift_stub.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': status}]})
+
+    with pytest.raises(RuntimeError, match=status):
+        cluster_lifecycle.snapshot_cluster(redshift_client, CLUSTER_ID, sleep=no_sleep)
+
+
+def test_snapshot_gives_up_after_timeout(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('create_cluster_snapshot', {})
+    for _ in range(3):
+        redshift_stub.add_response('describe_cluster_snapshots', {'Snapshots': [{'Status': 'creating'}]})
+
+    with pytest.raises(TimeoutError):
+        cluster_lifecycle.snapshot_cluster(redshift_client, CLUSTER_ID, poll_seconds=30,
+                                           timeout_seconds=60, sleep=no_sleep)
+
+
+def test_resize_waits_for_new_node_count(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('resize_cluster', {})
+    # describe_resize still reports an older resize before the new one registers
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 4, 'Status': 'SUCCEEDED'})
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'SUCCEEDED'})
+    # ...and the cluster still reports the old node count for a moment
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('describe_clusters', cluster('available', 6))
+
+    props = cluster_lifecycle.resize_cluster(redshift_client, CLUSTER_ID, 6, sleep=no_sleep)
+
+    assert props['NumberOfNodes'] == 6
+
+
+def test_resize_raises_when_rolled_back(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('resize_cluster', {})
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'IN_PROGRESS'})
+    redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'FAILED',
+                                                   'Message': 'Resize rolled back'})
+
+    with pytest.raises(RuntimeError, match="rolled back"):
+        cluster_lifecycle.resize_cluster(redshift_client, CLUSTER_ID, 6, sleep=no_sleep)
+
+
+def test_resize_gives_up_after_timeout(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('describe_clusters', cluster('available', 4))
+    redshift_stub.add_response('resize_cluster', {})
+    for _ in range(3):
+        redshift_stub.add_response('describe_resize', {'TargetNumberOfNodes': 6, 'Status': 'IN_PROGRESS'})
+
+    with pytest.raises(TimeoutError):
+        cluster_lifecycle.resize_cluster(redshift_client, CLUSTER_ID, 6, poll_seconds=30,
+                                         timeout_seconds=60, sleep=no_sleep)
+
+
+def test_resume_waits_until_cluster_is_usable(redshift):
+    redshift_client, redshift_stub = redshift
+    redshift_stub.add_response('describe_clusters', cluster('paused'))
+    redshift_stub.add_response('resume_cluster', {})
+    # Status already flipped but the cluster cannot take queries yet
+    redshift_stub.add_response('describe_clusters', cluster('available', availability='Unavailable'))
+    redshift_stub.add_response('describe_clusters', cluster('available'))
+
+    props = cluster_lifecycle.resume_cluster(redshift_client, CLUSTER_ID, sleep=no_sleep)
+
+    assert props['ClusterAvailabilityStatus'] == 'Available'
+
+
+def test_resume_waits_for_pausing_cluster_to_settle(redshift):
+    redshift_client, redshift_stub = redshift
+    # resume_cluster would be rejected while the cluster is still pausing
+    redshift_stub.add_response('describe_clusters', cluster('pausing', availability='Unavailable'))
+    redshift_stub.add_response('describe_clusters', cluster('paused', availability='Unavailable'))
+    redshift_stub.add_response('resume_cluster', {}, {'ClusterIdentifier': CLUSTER_ID})
+    redshift_stub.add_response('describe_clusters', cluster('available'))
+
+    props = cluster_lifecycle.resume_cluster(redshift_client, CLUSTER_ID, sleep=no_sleep)
+
+    assert props['ClusterStatus'] == 'available'
+
+
+@pytest.mark.parametrize("staging_bytes, expected", [
+    (1, 2),           # tiny load is clamped up to min_nodes
+    (600000, 6),      # 1000 bytes/second/node over 100s
+    (10 ** 9, 8),     # huge load is clamped down to max_nodes
+])
+def test_choose_node_count_clamps_to_bounds(staging_bytes, expected):
+    history = [{"node_type": "dc2.large", "node_count": "4", "staging_bytes": "400000", "seconds": "100"}]
+
+    nodes = cluster_lifecycle.choose_node_count(staging_bytes, history, "dc2.large", window_seconds=100,
+                                                min_nodes=2, max_nodes=8, default_nodes=4)
+
+    assert nodes == expected
+
+
+def test_choose_node_count_defaults_without_matching_history():
+    history = [{"node_type": "ra3.xlplus", "node_count": "2", "staging_bytes": "1000", "seconds": "10"}]
+
+    nodes = cluster_lifecycle.choose_node_count(10 ** 9, history, "dc2.large", window_seconds=100,
+                                                min_nodes=2, max_nodes=8, default_nodes=4)
+
+    assert nodes == 4
@@ -0,0 +1,151 @@
+import sys
+import pytest
+import explain_queries
+
+# ---------------------------------------------------------
+# Offline tests for explain_queries.py. Plans are sample EXPLAIN
+# text, and the database connection is replaced with a fake one.
+# Run with: python -m pytest -q
+# ---------------------------------------------------------
+
+REDSHIFT_PLAN = [
+    "XN Hash Join DS_DIST_NONE  (cost=0.05..120.50 rows=10 width=80)",
+    "  Hash Cond: ((\"outer\".artist)::text = (\"inner\".name_key)::text)",
+    "  ->  XN Seq Scan on staging_events e  (cost=0.00..2.50 rows=250 width=60)",
+    "        Filter: ((page)::text = 'NextSong'::text)",
+    "  ->  XN Hash  (cost=0.04..0.04 rows=4 width=40)",
+    "        ->  XN Seq Scan on song_lookup s  (cost=0.00..0.04 rows=4 width=40)",
+]
+
+REDSHIFT_BCAST_PLAN = [
+    "XN Hash Join DS_BCAST_INNER  (cost=0.05..120.50 rows=10 width=80)",
+    "  ->  XN Seq Scan on staging_events e  (cost=0.00..2.50 rows=250 width=60)",
+    "  ->  XN Hash  (cost=0.04..0.04 rows=4 width=40)",
+    "        ->  XN Seq Scan on song_lookup s  (cost=0.00..0.04 rows=4 width=40)",
+]
+
+POSTGRES_NESTED_LOOP_PLAN = [
+    "Insert on songplays  (cost=0.00..150.00 rows=10 width=80)",
+    "  ->  Nested Loop  (cost=0.00..150.00 rows=10 width=80)",
+    "        Join Filter: (lower(e.artist) = s.name_key)",
+    "        ->  Seq Scan on staging_events e  (cost=0.00..2.50 rows=250 width=60)",
+    "        ->  Seq Scan on song_lookup s  (cost=0.00..0.04 rows=4 width=40)",
+]
+
+
+def test_parse_plan_redshift():
+    plan = explain_queries.parse_plan(REDSHIFT_PLAN)
+
+    assert len(plan["steps"]) == 4
+    assert plan["steps"][0]["operation"] == "XN Hash Join DS_DIST_NONE"
+    assert plan["steps"][1]["operation"] == "XN Seq Scan on staging_events e"
+    assert plan["steps"][1]["rows"] == 250
+    assert plan["total_cost"] == 120.50
+    assert plan["nested_loops"] == 0
+    assert plan["redistributions"] == {}
+
+
+def test_parse_plan_postgres():
+    plan = explain_queries.parse_plan(POSTGRES_NESTED_LOOP_PLAN)
+
+    assert len(plan["steps"]) == 4
+    assert plan["steps"][1]["operation"] == "Nested Loop"
+    assert plan["total_cost"] == 150.00
+    assert plan["nested_loops"] == 1
+
+
+def test_new_broadcast_step_is_flagged():
+    previous = {"songplays": explain_queries.parse_plan(REDSHIFT_PLAN)}
+    current = {"songplays": explain_queries.parse_plan(REDSHIFT_BCAST_PLAN)}
+
+    regressions = explain_queries.find_regressions(previous, current)
+
+    assert regressions == ["songplays: DS_BCAST_INNER steps went from 0 to 1"]
+
+
+def test_new_nested_loop_is_flagged():
+    previous = {"songplays": explain_queries.parse_plan(REDSHIFT_PLAN)}
+    current = {"songplays": explain_queries.parse_plan(POSTGRES_NESTED_LOOP_PLAN)}
+
+    regressions = explain_queries.find_regressions(previous, current)
+
+    assert regressions == ["songplays: Nested Loop steps went from 0 to 1"]
+
+
+@pytest.mark.parametrize("new_cost, flagged", [
+    (200.0, False),   # exactly 2x is allowed
+    (200.1, True),    # just above 2x is flagged
+])
+def test_cost_ratio_threshold(new_cost, flagged):
+    previous = {"time": {"total_cost": 100.0, "nested_loops": 0, "redistributions": {}}}
+    current = {"time": {"total_cost": new_cost, "nested_loops": 0, "redistributions": {}}}
+
+    regressions = explain_queries.find_regressions(previous, current, cost_ratio=2.0)
+
+    assert bool(regressions) == flagged
+
+
+def test_flagged_run_is_not_used_as_baseline(tmp_path):
+    clean = {"songplays": explain_queries.parse_plan(REDSHIFT_PLAN)}
+    flagged = {"songplays": explain_queries.parse_plan(REDSHIFT_BCAST_PLAN)}
+    explain_queries.save_run("cluster", clean, [], plans_dir=str(tmp_path))
+    explain_queries.save_run("cluster", flagged, ["songplays: DS_BCAST_INNER steps went from 0 to 1"],
+                             plans_dir=str(tmp_path))
+
+    assert explain_queries.latest_run("cluster", plans_dir=str(tmp_path)) == clean
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def execute(self, query):
+        pass
+
+    def fetchall(self):
+        return [(line,) for line in self.plan]
+
+
+class FakeConnection:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def cursor(self):
+        return FakeCursor(self.plan)
+
+    def close(self):
+        pass
+
+
+def run_main(monkeypatch, plan, *args):
+    monkeypatch.setattr(explain_queries.psycopg2, "connect", lambda **kwargs: FakeConnection(plan))
+    monkeypatch.setattr(sys, "argv", ["explain_queries.py", *args])
+    explain_queries.main()
+
+
+def test_accept_makes_run_the_new_baseline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dwh.cfg").write_text(
+        "[CLUSTER]\nHOST=localhost\nDB_NAME=dwh\nDB_USER=dwhuser\nDB_PASSWORD=x\nDB_PORT=5439\n",
+        encoding="utf-8",
+    )
+
+    run_main(monkeypatch, REDSHIFT_PLAN)
+    with pytest.raises(SystemExit) as exit_info:
+        run_main(monkeypatch, REDSHIFT_BCAST_PLAN)
+    assert exit_info.value.code == 1
+
+    run_main(monkeypatch, REDSHIFT_BCAST_PLAN, "--accept")
+    # The broadcast plan is now the baseline, so the same plan passes
+    run_main(monkeypatch, REDSHIFT_BCAST_PLAN)
+
+    baseline = explain_queries.latest_run("cluster")
+    assert baseline["songplays"]["redistributions"] == {"DS_BCAST_INNER": 1}
+
+
+def test_explain_skips_non_insert_statements():
+    queries = ["TRUNCATE song_lookup;", "INSERT INTO song_lookup (name_key) SELECT 1;"]
+
+    plans = explain_queries.explain_queries(FakeCursor(REDSHIFT_PLAN), queries)
+
+    assert list(plans) == ["song_lookup"]
@@ -4,13 +4,17 @@ def reset_placeholders(config_path="dwh.cfg"):
     """
     Force replace HOST and IAM_ROLE_ARN lines with dynamic placeholders via text replacement.
     This avoids issues with ConfigUpdater removing comments or formatting.
+    Only HOST under [CLUSTER] is reset, so other sections keep their own HOST.
     """
     with open(config_path, "r", encoding="utf-8") as f:
         lines = f.readlines()
 
+    section = None
     with open(config_path, "w", encoding="utf-8") as f:
         for line in lines:
-            if line.strip().startswith("HOST="):
+            if line.strip().startswith("["):
+                section = line.strip().strip("[]").strip()
+            if section == "CLUSTER" and line.strip().startswith("HOST="):
                 f.write("HOST=${redshift_host}\n")
             elif line.strip().startswith("IAM_ROLE_ARN="):
                 f.write("IAM_ROLE_ARN=${iam_role_arn}\n")